@@ -2,14 +2,22 @@
 import json
 import logging
 import os
-import re
 import time
 from datetime import datetime, timedelta
-from threading import Thread
+from functools import lru_cache, wraps
 
 from telegram import Update
-from telegram.ext import (Application, CommandHandler, ContextTypes,
-                          MessageHandler, filters)
+from telegram.error import BadRequest
+from telegram.ext import Application, CommandHandler, ContextTypes
+
+# Prefer orjson for config (de)serialization, fall back to the stdlib
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = lambda obj: orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _loads = json.loads
+    _dumps = lambda obj: json.dumps(obj, indent=4).encode()
 
 # Set up logging
 logging.basicConfig(
@@ -18,14 +26,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Telegram user ID of the admin, read from the config at startup
+ADMIN_ID = None
+
+# Current Unix time
+_now = time.time
+
 # Config file path
 CONFIG_FILE = 'config.json'
 
+# State file path, holds data the bot updates on every post
+STATE_FILE = 'state.json'
+
+# Seconds per time interval unit, in the order units must appear
+_INTERVAL_UNITS = {'d': 86400, 'h': 3600, 'm': 60, 's': 1}
+_INTERVAL_ORDER = 'dhms'
+
+# Name of the repeating job that posts the picture
+SCHEDULED_POST_JOB = 'scheduled_post'
+
+# Static part of the /status reply
+_STATUS_TMPL = (
+    "📊 Current Bot Settings 📊\n\n"
+    "🔹 Channel: {channel}\n"
+    "🔹 Picture: {picture}\n"
+    "🔹 Posting interval: {interval} ({interval_fmt})\n"
+)
+
+# Parsed config, reused until the file's mtime changes
+_cfg_cache = {"mtime": None, "data": None}
+
 def load_config():
     """Load configuration from JSON file."""
     try:
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+        if mtime == _cfg_cache["mtime"]:
+            return dict(_cfg_cache["data"])
+        with open(CONFIG_FILE, 'rb') as f:
+            config = _loads(f.read())
+        _cfg_cache["mtime"] = mtime
+        _cfg_cache["data"] = config
+        return dict(config)
     except FileNotFoundError:
         logger.error(f"Config file {CONFIG_FILE} not found.")
         raise
@@ -33,12 +74,58 @@ def load_config():
         logger.error(f"Error parsing {CONFIG_FILE}. Make sure it's valid JSON.")
         raise
 
+def _write_atomic(path, data):
+    """Write to a temporary file and swap it in, so a crash can't leave a torn file."""
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
 def save_config(config):
     """Save configuration to JSON file."""
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=4)
+    # Skip the write if the file on disk already holds this config
+    try:
+        unchanged = (config == _cfg_cache["data"]
+                     and os.stat(CONFIG_FILE).st_mtime_ns == _cfg_cache["mtime"])
+    except FileNotFoundError:
+        unchanged = False
+    if unchanged:
+        return
+    
+    _write_atomic(CONFIG_FILE, _dumps(config))
+    _cfg_cache["mtime"] = os.stat(CONFIG_FILE).st_mtime_ns
+    _cfg_cache["data"] = dict(config)
     logger.info("Config saved successfully.")
 
+def _load_state():
+    """Load the last post time from the state file."""
+    try:
+        with open(STATE_FILE, 'rb') as f:
+            return _loads(f.read())['last_post_time']
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, KeyError):
+        logger.error(f"Error parsing {STATE_FILE}, ignoring it.")
+        return None
+
+def _save_state(last_post_time):
+    """Save the last post time to the state file."""
+    _write_atomic(STATE_FILE, _dumps({'last_post_time': last_post_time}))
+
+def _migrate_state(config):
+    """Move last_post_time out of the config into the state file."""
+    if 'last_post_time' not in config:
+        return
+    
+    if config['last_post_time'] and _load_state() is None:
+        _save_state(config['last_post_time'])
+    del config['last_post_time']
+    save_config(config)
+    logger.info(f"Moved last_post_time from {CONFIG_FILE} to {STATE_FILE}.")
+
+@lru_cache(maxsize=128)
 def parse_time_interval(interval_str):
     """
     Parse a time interval string like "1d12h30m45s" into seconds.
@@ -47,48 +134,62 @@ def parse_time_interval(interval_str):
     if not interval_str:
         return 0
     
-    # Regular expression to match time components
-    pattern = r'(?:(\d+)d)?(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?'
-    match = re.match(pattern, interval_str)
+    total_seconds = 0
+    number = 0
+    has_digits = False
+    next_unit = 0  # Index into _INTERVAL_ORDER of the lowest unit still allowed
+    
+    for ch in interval_str:
+        if '0' <= ch <= '9':
+            number = number * 10 + (ord(ch) - 48)
+            has_digits = True
+        elif has_digits and _INTERVAL_ORDER.find(ch, next_unit) != -1:
+            # Each unit may appear at most once, in d/h/m/s order
+            next_unit = _INTERVAL_ORDER.index(ch) + 1
+            total_seconds += number * _INTERVAL_UNITS[ch]
+            number = 0
+            has_digits = False
+        else:
+            raise ValueError(f"Invalid time interval format: {interval_str}")
     
-    if not match or not any(match.groups()):
+    # A trailing number without a unit is not a valid interval
+    if has_digits:
         raise ValueError(f"Invalid time interval format: {interval_str}")
     
-    days = int(match.group(1) or 0)
-    hours = int(match.group(2) or 0)
-    minutes = int(match.group(3) or 0)
-    seconds = int(match.group(4) or 0)
-    
-    total_seconds = days * 86400 + hours * 3600 + minutes * 60 + seconds
     return total_seconds
 
+@lru_cache(maxsize=128)
 def format_time_interval(seconds):
     """Format seconds into a human-readable time interval string."""
     days, remainder = divmod(seconds, 86400)
     hours, remainder = divmod(remainder, 3600)
     minutes, seconds = divmod(remainder, 60)
     
-    result = ""
+    parts = []
     if days > 0:
-        result += f"{days}d"
+        parts.append(f"{days}d")
     if hours > 0:
-        result += f"{hours}h"
+        parts.append(f"{hours}h")
     if minutes > 0:
-        result += f"{minutes}m"
-    if seconds > 0 or not result:
-        result += f"{seconds}s"
+        parts.append(f"{minutes}m")
+    if seconds > 0 or not parts:
+        parts.append(f"{seconds}s")
     
-    return result
+    return "".join(parts)
+
+def admin_only(handler):
+    """Only run the handler for updates sent by the admin."""
+    @wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if update.effective_user.id != ADMIN_ID:
+            await update.message.reply_text("You are not authorized to use this bot.")
+            return
+        return await handler(update, context)
+    return wrapper
 
+@admin_only
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Send a message when the command /start is issued."""
-    config = load_config()
-    
-    # Only respond to the admin
-    if update.effective_user.id != config['admin_id']:
-        await update.message.reply_text("You are not authorized to use this bot.")
-        return
-    
     await update.message.reply_text(
         "Welcome to the Same Picture Posting Bot!\n\n"
         "Commands:\n"
@@ -99,77 +200,67 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/setpicture - Reply to a photo to set it as the picture to post"
     )
 
+@admin_only
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show current bot settings."""
     config = load_config()
     
-    # Only respond to the admin
-    if update.effective_user.id != config['admin_id']:
-        await update.message.reply_text("You are not authorized to use this bot.")
-        return
-    
     interval_seconds = parse_time_interval(config['post_interval'])
     
-    status_text = (
-        f"📊 Current Bot Settings 📊\n\n"
-        f"🔹 Channel: {config['channel_name']}\n"
-        f"🔹 Picture: {config['picture_path']}\n"
-        f"🔹 Posting interval: {config['post_interval']} ({format_time_interval(interval_seconds)})\n"
-    )
+    parts = [_STATUS_TMPL.format(
+        channel=config['channel_name'],
+        picture=config['picture_path'],
+        interval=config['post_interval'],
+        interval_fmt=format_time_interval(interval_seconds),
+    )]
     
-    if config['last_post_time']:
-        last_post = datetime.fromtimestamp(config['last_post_time'])
+    last_post_time = _load_state()
+    if last_post_time:
+        last_post = datetime.fromtimestamp(last_post_time)
         next_post = last_post + timedelta(seconds=interval_seconds)
         now = datetime.now()
         
-        status_text += (
-            f"🔹 Last post: {last_post.strftime('%Y-%m-%d %H:%M:%S')}\n"
-            f"🔹 Next post: {next_post.strftime('%Y-%m-%d %H:%M:%S')}\n"
-        )
+        parts.append(f"🔹 Last post: {last_post:%Y-%m-%d %H:%M:%S}\n")
+        parts.append(f"🔹 Next post: {next_post:%Y-%m-%d %H:%M:%S}\n")
         
         if next_post > now:
-            time_left = next_post - now
-            hours, remainder = divmod(time_left.seconds, 3600)
-            minutes, seconds = divmod(remainder, 60)
-            status_text += f"🔹 Time until next post: {time_left.days}d {hours}h {minutes}m {seconds}s\n"
+            time_left = int((next_post - now).total_seconds())
+            parts.append(f"🔹 Time until next post: {format_time_interval(time_left)}\n")
     else:
-        status_text += "🔹 No posts have been made yet.\n"
+        parts.append("🔹 No posts have been made yet.\n")
     
+    status_text = "".join(parts)
     await update.message.reply_text(status_text)
 
+@admin_only
 async def set_channel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Set the target channel."""
-    config = load_config()
-    
-    # Only respond to the admin
-    if update.effective_user.id != config['admin_id']:
-        await update.message.reply_text("You are not authorized to use this bot.")
-        return
+    reply = update.message.reply_text
+    args = context.args
     
-    if not context.args or not context.args[0].startswith('@'):
-        await update.message.reply_text(
+    if not args or not args[0].startswith('@'):
+        await reply(
             "Please provide a valid channel name starting with @.\n"
             "Example: /setchannel @your_channel_name"
         )
         return
     
-    channel_name = context.args[0]
+    channel_name = args[0]
+    config = load_config()
     config['channel_name'] = channel_name
     save_config(config)
+    refresh_scheduled_post(context.application, config)
     
-    await update.message.reply_text(f"Channel set to {channel_name}")
+    await reply(f"Channel set to {channel_name}")
 
+@admin_only
 async def set_interval(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Set the posting interval."""
-    config = load_config()
+    reply = update.message.reply_text
+    args = context.args
     
-    # Only respond to the admin
-    if update.effective_user.id != config['admin_id']:
-        await update.message.reply_text("You are not authorized to use this bot.")
-        return
-    
-    if not context.args:
-        await update.message.reply_text(
+    if not args:
+        await reply(
             "Please provide a time interval.\n"
             "Examples:\n"
             "/setinterval 1d - Once per day\n"
@@ -179,128 +270,156 @@ async def set_interval(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    interval_str = context.args[0]
+    interval_str = args[0]
     
     try:
         seconds = parse_time_interval(interval_str)
-        if seconds < 10:  # Minimum 10 seconds
-            await update.message.reply_text("Interval must be at least 10 seconds.")
-            return
-            
-        config['post_interval'] = interval_str
-        save_config(config)
-        
-        await update.message.reply_text(
-            f"Posting interval set to {interval_str} ({format_time_interval(seconds)})"
-        )
     except ValueError as e:
-        await update.message.reply_text(str(e))
+        await reply(str(e))
+        return
+    
+    if seconds < 10:  # Minimum 10 seconds
+        await reply("Interval must be at least 10 seconds.")
+        return
+    
+    config = load_config()
+    config['post_interval'] = interval_str
+    save_config(config)
+    
+    # Reschedule posting with the new interval
+    await schedule_next_post(context.application)
+    
+    await reply(
+        f"Posting interval set to {interval_str} ({format_time_interval(seconds)})"
+    )
 
+@admin_only
 async def set_picture(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Set the picture to post."""
-    config = load_config()
-    
-    # Only respond to the admin
-    if update.effective_user.id != config['admin_id']:
-        await update.message.reply_text("You are not authorized to use this bot.")
-        return
+    message = update.message
+    reply = message.reply_text
     
     # Check if the message is a reply to a photo
-    if update.message.reply_to_message and update.message.reply_to_message.photo:
-        photo = update.message.reply_to_message.photo[-1]  # Get the largest photo
+    if message.reply_to_message and message.reply_to_message.photo:
+        photo = message.reply_to_message.photo[-1]  # Get the largest photo
         
         # Create pictures directory if it doesn't exist
         os.makedirs('pictures', exist_ok=True)
         
         # Download the photo
         file = await context.bot.get_file(photo.file_id)
-        file_path = f"pictures/picture_{int(time.time())}.jpg"
+        file_path = f"pictures/picture_{int(_now())}.jpg"
         await file.download_to_drive(file_path)
         
-        # Update config
+        # Update config, reusing the file_id of the photo already on Telegram
+        config = load_config()
         config['picture_path'] = file_path
+        config['picture_file_id'] = photo.file_id
         save_config(config)
+        refresh_scheduled_post(context.application, config)
         
-        await update.message.reply_text(f"Picture set to {file_path}")
+        await reply(f"Picture set to {file_path}")
     else:
-        await update.message.reply_text(
+        await reply(
             "Please reply to a photo with /setpicture to set it as the picture to post."
         )
 
+async def send_picture(bot, chat_id, path, file_id=None):
+    """
+    Send the picture to a chat and return its Telegram file_id.
+    Reuses an already uploaded picture by file_id when one is known,
+    falling back to uploading from disk if Telegram rejects it.
+    """
+    send_photo = bot.send_photo
+    
+    if file_id:
+        try:
+            await send_photo(chat_id=chat_id, photo=file_id)
+            return file_id
+        except BadRequest as e:
+            logger.warning(f"Cached picture file_id rejected, re-uploading: {str(e)}")
+    
+    # Raises FileNotFoundError if the picture is missing
+    with open(path, 'rb') as photo:
+        message = await send_photo(chat_id=chat_id, photo=photo)
+    return message.photo[-1].file_id
+
+@admin_only
 async def post_now(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Post the picture now."""
-    config = load_config()
+    reply = update.message.reply_text
     
-    # Only respond to the admin
-    if update.effective_user.id != config['admin_id']:
-        await update.message.reply_text("You are not authorized to use this bot.")
-        return
+    config = load_config()
     
     try:
-        # Check if the picture exists
-        if not os.path.exists(config['picture_path']):
-            await update.message.reply_text(
+        # Post the picture
+        try:
+            file_id = await send_picture(
+                context.bot,
+                config['channel_name'],
+                config['picture_path'],
+                config.get('picture_file_id')
+            )
+        except FileNotFoundError:
+            await reply(
                 f"Picture not found: {config['picture_path']}\n"
                 "Please set a valid picture using /setpicture."
             )
             return
         
-        # Post the picture
-        with open(config['picture_path'], 'rb') as photo:
-            await context.bot.send_photo(
-                chat_id=config['channel_name'],
-                photo=photo
-            )
-        
         # Update last post time
-        config['last_post_time'] = int(time.time())
-        save_config(config)
+        _save_state(int(_now()))
         
-        await update.message.reply_text("Picture posted successfully!")
+        # Remember the uploaded picture
+        if file_id != config.get('picture_file_id'):
+            config['picture_file_id'] = file_id
+            save_config(config)
+            refresh_scheduled_post(context.application, config)
+        
+        await reply("Picture posted successfully!")
     except Exception as e:
-        await update.message.reply_text(f"Error posting picture: {str(e)}")
+        await reply(f"Error posting picture: {str(e)}")
 
 async def post_scheduled_picture(context: ContextTypes.DEFAULT_TYPE):
     """Post the scheduled picture to the channel."""
-    config = load_config()
+    # Channel and picture are snapshotted into the job data at schedule time
+    data = context.job.data
+    path = data['path']
+    chat = data['chat']
     
     try:
-        # Check if the picture exists
-        if not os.path.exists(config['picture_path']):
-            logger.error(f"Picture not found: {config['picture_path']}")
-            return
-        
         # Post the picture
-        with open(config['picture_path'], 'rb') as photo:
-            await context.bot.send_photo(
-                chat_id=config['channel_name'],
-                photo=photo
-            )
+        try:
+            file_id = await send_picture(context.bot, chat, path, data['file_id'])
+        except FileNotFoundError:
+            logger.error(f"Picture not found: {path}")
+            return
         
         # Update last post time
-        config['last_post_time'] = int(time.time())
-        save_config(config)
+        _save_state(int(_now()))
+        
+        # Remember the uploaded picture
+        if file_id != data['file_id']:
+            data['file_id'] = file_id
+            config = load_config()
+            config['picture_file_id'] = file_id
+            save_config(config)
         
-        logger.info(f"Scheduled picture posted to {config['channel_name']}")
+        logger.info(f"Scheduled picture posted to {chat}")
     except Exception as e:
         logger.error(f"Error posting scheduled picture: {str(e)}")
 
-async def schedule_next_post_callback(context: ContextTypes.DEFAULT_TYPE):
-    """Callback to schedule the next post."""
-    application = context.application
-    await schedule_next_post(application)
-
 async def schedule_next_post(application):
-    """Schedule the next post based on the config."""
+    """Schedule repeating posts based on the config."""
     config = load_config()
     
     # Calculate when to post next
     interval_seconds = parse_time_interval(config['post_interval'])
     
-    if config['last_post_time']:
-        last_post_time = config['last_post_time']
+    last_post_time = _load_state()
+    if last_post_time:
         next_post_time = last_post_time + interval_seconds
-        now = int(time.time())
+        now = int(_now())
         
         # If next post time is in the past, post immediately
         if next_post_time <= now:
@@ -313,18 +432,32 @@ async def schedule_next_post(application):
     
     logger.info(f"Scheduling next post in {format_time_interval(delay)}")
     
-    # Schedule the job
-    application.job_queue.run_once(
-        post_scheduled_picture,
-        timedelta(seconds=delay)
-    )
+    # Replace any previously scheduled posting job
+    for job in application.job_queue.get_jobs_by_name(SCHEDULED_POST_JOB):
+        job.schedule_removal()
     
-    # Schedule the next post after this one
-    application.job_queue.run_once(
-        schedule_next_post_callback,
-        timedelta(seconds=delay + 1)  # Schedule 1 second after posting
+    # Post after the delay, then every interval
+    application.job_queue.run_repeating(
+        post_scheduled_picture,
+        interval=interval_seconds,
+        first=delay,
+        name=SCHEDULED_POST_JOB,
+        data=_scheduled_post_data(config)
     )
 
+def _scheduled_post_data(config):
+    """Snapshot the settings the scheduled posting job needs."""
+    return {
+        'path': config['picture_path'],
+        'chat': config['channel_name'],
+        'file_id': config.get('picture_file_id'),
+    }
+
+def refresh_scheduled_post(application, config):
+    """Update the scheduled posting job with the current settings."""
+    for job in application.job_queue.get_jobs_by_name(SCHEDULED_POST_JOB):
+        job.data = _scheduled_post_data(config)
+
 async def setup_and_schedule(application):
     """Set up the application and schedule the first post."""
     # Add command handlers
@@ -340,8 +473,19 @@ async def setup_and_schedule(application):
 
 def main():
     """Start the bot."""
+    global ADMIN_ID
+    
+    # Use uvloop for the event loop if it's installed
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     # Load config
     config = load_config()
+    ADMIN_ID = config['admin_id']
+    _migrate_state(config)
     
     # Create the Application
     application = Application.builder().token(config['bot_token']).build()